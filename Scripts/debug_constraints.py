@@ -1,25 +1,56 @@
 import pandas as pd
+import numpy as np
 import json
-from datetime import datetime
+import sys
+
+sys.path.append('src')
+from time_utils import time_to_minutes
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+def read_clients(path: str) -> pd.DataFrame:
+    """Read the clients CSV, with the multithreaded Arrow reader when available"""
+    if not HAS_PYARROW:
+        return pd.read_csv(path)
+    # Keep HH:MM as text; Arrow would otherwise infer time64 columns
+    convert_options = pa_csv.ConvertOptions(column_types={
+        'time_window_start': pa.string(),
+        'time_window_end': pa.string(),
+    })
+    return pa_csv.read_csv(path, convert_options=convert_options).to_pandas()
+
 
 # Load data
-config = json.load(open('data/config.json'))
-clients_df = pd.read_csv('data/clients.csv')
+with open('data/config.json') as f:
+    config = json.load(f)
+clients_df = read_clients('data/clients.csv')
 
 print("="*80)
 print("CONSTRAINT ANALYSIS")
 print("="*80)
 
-# Working hours
-work_start = datetime.strptime(config['sales_rep']['working_hours']['start'], '%H:%M')
-work_end = datetime.strptime(config['sales_rep']['working_hours']['end'], '%H:%M')
-work_duration = (work_end - work_start).total_seconds() / 60
+# Working hours, as minutes since midnight
+working_hours = config['sales_rep']['working_hours']
+work_start = time_to_minutes(working_hours['start'])
+work_end = time_to_minutes(working_hours['end'])
+work_duration = work_end - work_start
 
-print(f"\n1. WORKING HOURS: {work_start.strftime('%H:%M')} - {work_end.strftime('%H:%M')}")
+print(f"\n1. WORKING HOURS: {working_hours['start']} - {working_hours['end']}")
 print(f"   Total available time: {work_duration} minutes ({work_duration/60:.1f} hours)")
 
 # Service time
-total_service_time = clients_df['service_duration'].sum()
+missing_duration = clients_df['service_duration'].isna()
+if missing_duration.any():
+    raise ValueError(f"Missing service_duration for clients: "
+                     f"{', '.join(clients_df.loc[missing_duration, 'client_id'])}")
+service_durations = clients_df['service_duration'].to_numpy(dtype=np.int32)
+total_service_time = int(service_durations.sum())
 print(f"\n2. TOTAL SERVICE TIME: {total_service_time} minutes ({total_service_time/60:.1f} hours)")
 
 # Travel time constraint
@@ -41,16 +72,19 @@ else:
 
 # Check time windows
 print(f"\n6. TIME WINDOW CONFLICTS:")
-for _, client in clients_df.iterrows():
-    tw_start = datetime.strptime(client['time_window_start'], '%H:%M')
-    tw_end = datetime.strptime(client['time_window_end'], '%H:%M')
-    window_duration = (tw_end - tw_start).total_seconds() / 60
-    
-    if tw_start < work_start or tw_end > work_end:
+tw_start = clients_df['time_window_start'].map(time_to_minutes).to_numpy()
+tw_end = clients_df['time_window_end'].map(time_to_minutes).to_numpy()
+window_min = tw_end - tw_start
+outside = (tw_start < work_start) | (tw_end > work_end)
+too_short = ~outside & (window_min < service_durations)
+
+for i in (outside | too_short).nonzero()[0]:
+    client = clients_df.iloc[i]
+    if outside[i]:
         print(f"   ⚠️  {client['client_id']}: Window {client['time_window_start']}-{client['time_window_end']} "
               f"outside working hours!")
-    elif window_duration < client['service_duration']:
+    else:
         print(f"   ⚠️  {client['client_id']}: Window too short! "
-              f"Need {client['service_duration']} min but window is {window_duration} min")
+              f"Need {client['service_duration']} min but window is {window_min[i]} min")
 
 print("\n" + "="*80)
\ No newline at end of file
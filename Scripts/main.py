@@ -5,9 +5,9 @@ Optimizes daily routes for sales representatives using VRP
 """
 
 import json
+import logging
 import pandas as pd
 import numpy as np
-from datetime import datetime
 import sys
 import os
 
@@ -18,6 +18,7 @@ from distance_matrix import DistanceMatrixCalculator
 from vrp_solver import VRPSolver
 from scheduler import ScheduleGenerator
 from visualizer import RouteVisualizer
+from time_utils import time_to_minutes
 
 def load_config(config_path='data/config.json'):
     """Load configuration file"""
@@ -32,13 +33,20 @@ def load_clients(clients_path='data/clients.csv'):
 
 def convert_time_to_minutes(time_str, base_time_str='09:00'):
     """Convert HH:MM to minutes from base time"""
-    base = datetime.strptime(base_time_str, '%H:%M')
-    target = datetime.strptime(time_str, '%H:%M')
-    diff = (target - base).total_seconds() / 60
-    return int(diff)
+    return time_to_minutes(time_str) - time_to_minutes(base_time_str)
+
+def convert_times_to_minutes(time_series, base_time_str='09:00'):
+    """Convert a Series of HH:MM strings to minutes from base time"""
+    base = pd.to_datetime(base_time_str, format='%H:%M')
+    target = pd.to_datetime(time_series, format='%H:%M')
+    return ((target - base).dt.total_seconds() // 60).astype(int)
 
 def main():
     """Main execution function"""
+    # Solver progress goes through logging; show it like the other steps
+    solver_logger = logging.getLogger(VRPSolver.__module__)
+    solver_logger.addHandler(logging.StreamHandler(sys.stdout))
+    solver_logger.setLevel(logging.INFO)
     
     print("\n" + "="*80)
     print("🚗 SALES ROUTE OPTIMIZER - VRP SOLVER")
@@ -56,10 +64,13 @@ def main():
         config['sales_rep']['start_location']['longitude']
     )
     
-    client_locations = list(zip(clients_df['latitude'], clients_df['longitude']))
-    all_locations = [depot_location] + client_locations
+    # (n, 2) array of (lat, lon), depot first
+    all_locations = np.vstack([
+        depot_location,
+        clients_df[['latitude', 'longitude']].to_numpy(dtype=np.float64)
+    ])
     
-    print(f"✓ Total locations: {len(all_locations)} (1 depot + {len(client_locations)} clients)")
+    print(f"✓ Total locations: {len(all_locations)} (1 depot + {len(clients_df)} clients)")
     
     # Step 3: Calculate distance matrix
     print("\nStep 3: Calculating distance and time matrix...")
@@ -80,14 +91,8 @@ def main():
     # Convert time windows to minutes from start of day
     base_time = config['sales_rep']['working_hours']['start']
     
-    time_windows = [(0, 0)]  # Depot time window (placeholder)
-    service_times = [0]  # Depot service time
-    
-    for _, client in clients_df.iterrows():
-        tw_start = convert_time_to_minutes(client['time_window_start'], base_time)
-        tw_end = convert_time_to_minutes(client['time_window_end'], base_time)
-        time_windows.append((tw_start, tw_end))
-        service_times.append(client['service_duration'])
+    tw_start = convert_times_to_minutes(clients_df['time_window_start'], base_time)
+    tw_end = convert_times_to_minutes(clients_df['time_window_end'], base_time)
     
     # Set depot time window (full working day)
     work_start = 0
@@ -95,7 +100,9 @@ def main():
         config['sales_rep']['working_hours']['end'], 
         base_time
     )
-    time_windows[0] = (work_start, work_end)
+    
+    time_windows = [(work_start, work_end)] + list(zip(tw_start.tolist(), tw_end.tolist()))
+    service_times = [0] + clients_df['service_duration'].astype(int).tolist()  # Depot has no service time
     
     # Max capacities
     max_distance = config['sales_rep']['max_distance_km']
@@ -112,7 +119,7 @@ def main():
     
     solver = VRPSolver(None)
     data = solver.create_data_model(
-        distance_matrix=distance_matrix * 1000,  # Convert to meters for OR-Tools
+        distance_matrix=distance_matrix,  # km, converted to centimeters by the solver
         time_matrix=time_matrix,
         time_windows=time_windows,
         service_times=service_times,
@@ -1,83 +1,213 @@
 import requests
 import numpy as np
 import json
-from typing import List, Tuple, Dict
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Tuple, Dict, Union
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:  # Numba is optional, fall back to plain NumPy
+    HAS_NUMBA = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:  # orjson is optional, fall back to requests' JSON decoding
+    HAS_ORJSON = False
+
+EARTH_RADIUS_KM = 6371.0
+FALLBACK_SPEED_KMH = 40.0
+
+# Large /table requests are split into row blocks fetched concurrently
+OSRM_CHUNK_SIZE = 50
+OSRM_MAX_WORKERS = 16
+
+
+def _haversine_matrix_numpy(lats: np.ndarray, lons: np.ndarray,
+                            out_d: np.ndarray, out_t: np.ndarray):
+    """Fill out_d (km) and out_t (minutes) using broadcast NumPy arrays"""
+    # Haversine is symmetric, so only the upper triangle is computed
+    iu, ju = np.triu_indices(len(lats), k=1)
+    lat_r = np.radians(lats)
+    lon_r = np.radians(lons)
+    dlat = lat_r[ju] - lat_r[iu]
+    dlon = lon_r[ju] - lon_r[iu]
+    a = (np.sin(dlat / 2) ** 2
+         + np.cos(lat_r[iu]) * np.cos(lat_r[ju]) * np.sin(dlon / 2) ** 2)
+    
+    out_d[:] = 0
+    out_d[iu, ju] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+    out_d += out_d.T
+    out_t[:] = out_d * (60.0 / FALLBACK_SPEED_KMH)
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _haversine_matrix(lats, lons, out_d, out_t):
+        """Fill out_d (km) and out_t (minutes), one row per parallel task"""
+        n = lats.shape[0]
+        for i in prange(n):
+            lat1 = np.radians(lats[i])
+            lon1 = np.radians(lons[i])
+            cos_lat1 = np.cos(lat1)
+            out_d[i, i] = 0.0
+            out_t[i, i] = 0.0
+            # Symmetric: compute the upper triangle and mirror it
+            for j in range(i + 1, n):
+                lat2 = np.radians(lats[j])
+                dlat = lat2 - lat1
+                dlon = np.radians(lons[j]) - lon1
+                a = (np.sin(dlat / 2) ** 2
+                     + cos_lat1 * np.cos(lat2) * np.sin(dlon / 2) ** 2)
+                dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+                out_d[i, j] = dist
+                out_d[j, i] = dist
+                out_t[i, j] = dist * (60.0 / FALLBACK_SPEED_KMH)
+                out_t[j, i] = out_t[i, j]
+    
+    # Pre-warm so the first real fallback doesn't pay the JIT compile
+    _warmup = np.zeros(2)
+    _haversine_matrix(_warmup, _warmup, np.empty((2, 2), dtype=np.float32),
+                      np.empty((2, 2), dtype=np.float32))
+    del _warmup
+else:
+    _haversine_matrix = _haversine_matrix_numpy
+
 
 class DistanceMatrixCalculator:
     """Calculate distance and time matrix using OSRM"""
     
-    def __init__(self, osrm_server: str = "http://router.project-osrm.org"):
+    def __init__(self, osrm_server: str = "http://router.project-osrm.org",
+                 cache_dir: str = 'output/cache'):
         self.osrm_server = osrm_server
+        self.cache_dir = cache_dir  # None disables the on-disk OSRM cache
         
-    def get_matrix(self, locations: List[Tuple[float, float]]) -> Dict:
+        self._session = requests.Session()
+        # Pooled keep-alive connections, retrying transient OSRM failures
+        retry = Retry(total=3, backoff_factor=0.3,
+                      status_forcelist=[500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=OSRM_MAX_WORKERS,
+                              pool_maxsize=OSRM_MAX_WORKERS,
+                              max_retries=retry)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+    
+    def _cache_path(self, coords: np.ndarray) -> str:
+        """Cache file for this exact (ordered) location list and server"""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self.osrm_server.encode())
+        h.update(np.ascontiguousarray(coords, dtype=np.float64).tobytes())
+        return os.path.join(self.cache_dir, f"{h.hexdigest()}.npz")
+        
+    def get_matrix(self, locations: Union[np.ndarray, List[Tuple[float, float]]]) -> Dict:
         """
         Get distance and time matrix for all locations
         
         Args:
-            locations: List of (lat, lon) tuples
+            locations: (n, 2) array of (lat, lon), or a list of (lat, lon) tuples
             
         Returns:
             Dict with 'distances' (km) and 'durations' (minutes)
         """
+        coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+        
+        if self.cache_dir:
+            cache_path = self._cache_path(coords)
+            if os.path.exists(cache_path):
+                print(f"✓ Loaded cached distance matrix from {cache_path}")
+                matrix_data = self.load_matrix(cache_path)
+                matrix_data['locations'] = locations
+                return matrix_data
+        
         # Convert to lon,lat format for OSRM
-        coordinates = ";".join([f"{lon},{lat}" for lat, lon in locations])
+        coordinates = ";".join([f"{lon:.6f},{lat:.6f}" for lat, lon in coords.tolist()])
         
         # OSRM API endpoint
         url = f"{self.osrm_server}/table/v1/driving/{coordinates}"
-        params = {
-            "annotations": "distance,duration"
-        }
+        
+        n = len(coords)
+        row_blocks = [range(start, min(start + OSRM_CHUNK_SIZE, n))
+                      for start in range(0, n, OSRM_CHUNK_SIZE)]
         
         try:
-            print(f"Fetching distance matrix for {len(locations)} locations...")
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            print(f"Fetching distance matrix for {n} locations...")
+            distances_m = np.empty((n, n), dtype=np.float32)  # meters
+            durations_s = np.empty((n, n), dtype=np.float32)  # seconds
             
-            if data['code'] != 'Ok':
-                raise Exception(f"OSRM Error: {data.get('message', 'Unknown error')}")
+            if len(row_blocks) == 1:
+                blocks = [self._fetch_table(url, row_blocks[0], n)]
+            else:
+                workers = min(OSRM_MAX_WORKERS, len(row_blocks))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    blocks = list(pool.map(
+                        lambda rows: self._fetch_table(url, rows, n), row_blocks))
             
-            # Extract matrices
-            distances_m = np.array(data['distances'])  # meters
-            durations_s = np.array(data['durations'])  # seconds
+            # Stitch the row blocks back together
+            for rows, data in zip(row_blocks, blocks):
+                distances_m[rows.start:rows.stop] = data['distances']
+                durations_s[rows.start:rows.stop] = data['durations']
             
             # Convert to km and minutes
-            distances_km = distances_m / 1000
-            durations_min = durations_s / 60
+            distances_km = (distances_m / 1000.0).astype(np.float32, copy=False)
+            durations_min = (durations_s / 60.0).astype(np.float32, copy=False)
             
             print(f"✓ Distance matrix calculated successfully")
             
-            return {
+            matrix_data = {
                 'distances': distances_km,
                 'durations': durations_min,
                 'locations': locations
             }
             
+            if self.cache_dir:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self.save_matrix(matrix_data, cache_path)
+            
+            return matrix_data
+            
         except requests.exceptions.RequestException as e:
             print(f"✗ Error fetching distance matrix: {e}")
-            print("Falling back to Euclidean distance...")
+            print("Falling back to Haversine distance...")
             return self._euclidean_fallback(locations)
     
-    def _euclidean_fallback(self, locations: List[Tuple[float, float]]) -> Dict:
-        """Fallback to Euclidean distance if OSRM fails"""
-        n = len(locations)
-        distances = np.zeros((n, n))
-        durations = np.zeros((n, n))
-        
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    # Approximate distance using Haversine
-                    lat1, lon1 = locations[i]
-                    lat2, lon2 = locations[j]
-                    
-                    # Simple Euclidean (rough approximation)
-                    dlat = (lat2 - lat1) * 111  # 1 degree ≈ 111 km
-                    dlon = (lon2 - lon1) * 111 * np.cos(np.radians(lat1))
-                    dist = np.sqrt(dlat**2 + dlon**2)
-                    
-                    distances[i][j] = dist
-                    durations[i][j] = dist / 40 * 60  # Assume 40 km/h, convert to minutes
+    def _fetch_table(self, url: str, rows: range, n: int) -> Dict:
+        """Fetch the OSRM /table rows for the given source indices"""
+        params = {
+            "annotations": "distance,duration"
+        }
+        if len(rows) < n:
+            params["sources"] = ";".join(map(str, rows))
+        
+        response = self._session.get(url, params=params, timeout=30)
+        response.raise_for_status()
+        if HAS_ORJSON:
+            # Surface bad bodies as a RequestException like response.json() does
+            try:
+                data = orjson.loads(response.content)
+            except orjson.JSONDecodeError as e:
+                raise requests.exceptions.InvalidJSONError(str(e), response=response) from e
+        else:
+            data = response.json()
+        
+        if data['code'] != 'Ok':
+            raise Exception(f"OSRM Error: {data.get('message', 'Unknown error')}")
+        
+        return data
+    
+    def _euclidean_fallback(self, locations: Union[np.ndarray, List[Tuple[float, float]]]) -> Dict:
+        """Fallback to Haversine (straight-line) distance if OSRM fails"""
+        coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+        lats = np.ascontiguousarray(coords[:, 0])
+        lons = np.ascontiguousarray(coords[:, 1])
+        
+        n = len(lats)
+        distances = np.empty((n, n), dtype=np.float32)
+        durations = np.empty((n, n), dtype=np.float32)
+        _haversine_matrix(lats, lons, distances, durations)
         
         return {
             'distances': distances,
@@ -85,17 +215,57 @@ class DistanceMatrixCalculator:
             'locations': locations
         }
     
-    def save_matrix(self, matrix_data: Dict, filepath: str):
-        """Save matrix data to file"""
-        np.savez(filepath, 
-                 distances=matrix_data['distances'],
-                 durations=matrix_data['durations'])
+    def save_matrix(self, matrix_data: Dict, filepath: str, precision: str = 'fp32'):
+        """
+        Save matrix data to a compressed file
+        
+        Args:
+            matrix_data: Dict with 'distances' and 'durations'
+            filepath: Destination .npz path
+            precision: 'fp32', or 'fp16' for smaller archival files
+        """
+        dtypes = {'fp32': np.float32, 'fp16': np.float16}
+        if precision not in dtypes:
+            raise ValueError(f"Unknown precision '{precision}', expected 'fp32' or 'fp16'")
+        
+        distances = np.asarray(matrix_data['distances'])
+        durations = np.asarray(matrix_data['durations'])
+        n = len(distances)
+        
+        # Symmetric matrices (e.g. the Haversine fallback) only need the upper triangle
+        symmetric = (np.array_equal(distances, distances.T)
+                     and np.array_equal(durations, durations.T))
+        if symmetric:
+            iu = np.triu_indices(n, k=1)
+            distances = distances[iu]
+            durations = durations[iu]
+        
+        np.savez_compressed(filepath,
+                            distances=distances.astype(dtypes[precision]),
+                            durations=durations.astype(dtypes[precision]),
+                            n=n,
+                            symmetric=symmetric)
         print(f"✓ Matrix saved to {filepath}")
     
     def load_matrix(self, filepath: str) -> Dict:
         """Load matrix data from file"""
-        data = np.load(filepath)
+        with np.load(filepath) as data:
+            distances = data['distances'].astype(np.float32)
+            durations = data['durations'].astype(np.float32)
+            
+            if 'symmetric' in data.files and bool(data['symmetric']):
+                n = int(data['n'])
+                distances = self._from_upper_triangle(distances, n)
+                durations = self._from_upper_triangle(durations, n)
+        
         return {
-            'distances': data['distances'],
-            'durations': data['durations']
-        }
\ No newline at end of file
+            'distances': distances,
+            'durations': durations
+        }
+    
+    @staticmethod
+    def _from_upper_triangle(values: np.ndarray, n: int) -> np.ndarray:
+        """Rebuild a full symmetric (n, n) matrix from its upper triangle"""
+        matrix = np.zeros((n, n), dtype=values.dtype)
+        matrix[np.triu_indices(n, k=1)] = values
+        return matrix + matrix.T
\ No newline at end of file
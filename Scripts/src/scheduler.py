@@ -1,5 +1,5 @@
+import sys
 import pandas as pd
-from datetime import datetime, timedelta
 from typing import Dict, List
 import numpy as np
 
@@ -19,120 +19,103 @@ class ScheduleGenerator:
         """Generate detailed timeline schedule"""
         
         route = self.solution['route']
-        schedule = []
+        n = len(route)
+        
+        location_idx = np.fromiter((s.location_index for s in route), dtype=np.int64, count=n)
+        arrival_min = np.fromiter((s.arrival_time for s in route), dtype=np.int64, count=n)
+        cumulative_m = np.fromiter((s.cumulative_distance for s in route), dtype=np.float64, count=n)
+        
+        is_depot = location_idx == 0
+        is_client = ~is_depot
+        is_start = is_depot & (np.arange(n) == 0)  # Start of day
+        is_return = is_depot & ~is_start  # End of day - return to depot
         
         # Parse working hours
         start_time_str = self.config['sales_rep']['working_hours']['start']
-        start_time = datetime.strptime(start_time_str, '%H:%M')
-        
-        for i, stop in enumerate(route):
-            location_idx = stop['location_index']
-            arrival_minutes = stop['arrival_time']
-            
-            # Calculate actual time - FIXED: Convert to int
-            arrival_time = start_time + timedelta(minutes=int(arrival_minutes))
-            
-            if location_idx == 0:  # Depot
-                if i == 0:  # Start of day
-                    schedule.append({
-                        'sequence': i + 1,
-                        'location': self.config['sales_rep']['start_location']['name'],
-                        'client_id': 'DEPOT',
-                        'address': 'Office',
-                        'arrival_time': arrival_time.strftime('%H:%M'),
-                        'service_start': arrival_time.strftime('%H:%M'),
-                        'service_duration': 0,
-                        'service_end': arrival_time.strftime('%H:%M'),
-                        'activity': 'Depart Office',
-                        'cumulative_distance_km': 0.0,
-                        'distance_from_previous_km': 0.0,
-                        'travel_time_from_previous_min': 0
-                    })
-                else:  # End of day - return to depot
-                    prev_location_idx = route[i-1]['location_index']
-                    distance = float(self.distance_matrix[prev_location_idx][location_idx])
-                    travel_time = float(self.time_matrix[prev_location_idx][location_idx])
-                    
-                    schedule.append({
-                        'sequence': i + 1,
-                        'location': self.config['sales_rep']['start_location']['name'],
-                        'client_id': 'DEPOT',
-                        'address': 'Office',
-                        'arrival_time': arrival_time.strftime('%H:%M'),
-                        'service_start': '-',
-                        'service_duration': 0,
-                        'service_end': '-',
-                        'activity': 'Return to Office',
-                        'cumulative_distance_km': float(stop['cumulative_distance']) / 1000,
-                        'distance_from_previous_km': distance,
-                        'travel_time_from_previous_min': int(travel_time)
-                    })
-            else:  # Client location
-                # Get client info
-                client = self.clients_df.iloc[location_idx - 1]  # -1 because depot is 0
-                
-                # Calculate distances - FIXED: Explicit type conversion
-                if i > 0:
-                    prev_location_idx = route[i-1]['location_index']
-                    distance = float(self.distance_matrix[prev_location_idx][location_idx])
-                    travel_time = float(self.time_matrix[prev_location_idx][location_idx])
-                else:
-                    distance = 0.0
-                    travel_time = 0.0
-                
-                # Service times - FIXED: Convert to int
-                service_duration = int(client['service_duration'])
-                service_start = arrival_time
-                service_end = arrival_time + timedelta(minutes=service_duration)
-                
-                schedule.append({
-                    'sequence': i + 1,
-                    'location': client['client_name'],
-                    'client_id': client['client_id'],
-                    'address': f"({client['latitude']:.4f}, {client['longitude']:.4f})",
-                    'arrival_time': arrival_time.strftime('%H:%M'),
-                    'service_start': service_start.strftime('%H:%M'),
-                    'service_duration': service_duration,
-                    'service_end': service_end.strftime('%H:%M'),
-                    'activity': f'Meeting ({client["priority"]} Priority)',
-                    'cumulative_distance_km': float(stop['cumulative_distance']) / 1000,
-                    'distance_from_previous_km': distance,
-                    'travel_time_from_previous_min': int(travel_time)
-                })
-        
-        df_schedule = pd.DataFrame(schedule)
+        start_time = pd.to_datetime(start_time_str, format='%H:%M')
+        arrival_times = start_time + pd.to_timedelta(arrival_min, unit='m')
+        
+        # Distance/time from the previous stop, gathered in one pass (first stop has none)
+        prev_idx, next_idx = location_idx[:-1], location_idx[1:]
+        distance = np.concatenate(([0.0], self.distance_matrix[prev_idx, next_idx]))
+        travel_time = np.concatenate(([0.0], self.time_matrix[prev_idx, next_idx]))
+        
+        # Client details for the client stops, -1 because depot is 0
+        clients = self.clients_df.take(location_idx[is_client] - 1)
+        
+        depot_name = self.config['sales_rep']['start_location']['name']
+        location = np.full(n, depot_name, dtype=object)
+        location[is_client] = clients['client_name'].to_numpy()
+        
+        client_id = np.full(n, 'DEPOT', dtype=object)
+        client_id[is_client] = clients['client_id'].to_numpy()
+        
+        address = np.full(n, 'Office', dtype=object)
+        address[is_client] = [f"({lat:.4f}, {lon:.4f})" for lat, lon in
+                              zip(clients['latitude'], clients['longitude'])]
+        
+        service_duration = np.zeros(n, dtype=np.int64)
+        service_duration[is_client] = clients['service_duration'].astype(int).to_numpy()
+        service_end = arrival_times + pd.to_timedelta(service_duration, unit='m')
+        
+        activity = np.where(is_start, 'Depart Office', 'Return to Office').astype(object)
+        activity[is_client] = ('Meeting (' + clients['priority'] + ' Priority)').to_numpy()
+        
+        arrival_str = arrival_times.strftime('%H:%M').to_numpy()
+        
+        df_schedule = pd.DataFrame({
+            'sequence': np.arange(1, n + 1),
+            'location': location,
+            'client_id': client_id,
+            'address': address,
+            'arrival_time': arrival_str,
+            'service_start': np.where(is_return, '-', arrival_str),
+            'service_duration': service_duration,
+            'service_end': np.where(is_return, '-', service_end.strftime('%H:%M').to_numpy()),
+            'activity': activity,
+            'cumulative_distance_km': np.where(is_start, 0.0, cumulative_m / 1000),
+            'distance_from_previous_km': distance,
+            'travel_time_from_previous_min': travel_time.astype(int)
+        })
         return df_schedule
     
     def print_schedule(self, schedule_df: pd.DataFrame):
         """Print formatted schedule"""
-        print("\n" + "="*80)
-        print(f"DAILY SCHEDULE - {self.config['sales_rep']['name']}")
-        print("="*80)
-        
-        for _, row in schedule_df.iterrows():
-            if row['client_id'] == 'DEPOT':
-                if row['sequence'] == 1:
-                    print(f"\n{row['arrival_time']} | 🏢 {row['activity']}")
+        lines = [
+            "\n" + "="*80,
+            f"DAILY SCHEDULE - {self.config['sales_rep']['name']}",
+            "="*80
+        ]
+        
+        for row in schedule_df.itertuples(index=False):
+            if row.client_id == 'DEPOT':
+                if row.sequence == 1:
+                    lines.append(f"\n{row.arrival_time} | 🏢 {row.activity}")
                 else:
-                    print(f"\n{row['arrival_time']} | 🏁 {row['activity']}")
-                    print(f"           Distance: {row['distance_from_previous_km']:.1f} km | "
-                          f"Travel Time: {row['travel_time_from_previous_min']} min")
+                    lines.append(f"\n{row.arrival_time} | 🏁 {row.activity}")
+                    lines.append(f"           Distance: {row.distance_from_previous_km:.1f} km | "
+                                 f"Travel Time: {row.travel_time_from_previous_min} min")
             else:
-                print(f"\n{row['arrival_time']} | 📍 Arrive at {row['location']}")
-                print(f"           Distance from previous: {row['distance_from_previous_km']:.1f} km | "
-                      f"Travel: {row['travel_time_from_previous_min']} min")
-                print(f"{row['service_start']} | 🤝 Meeting Start ({row['service_duration']} min) - {row['activity']}")
-                print(f"{row['service_end']} | ✓ Meeting End, Depart")
-        
-        print("\n" + "="*80)
-        print("SUMMARY")
-        print("="*80)
-        print(f"Total Clients Visited: {len(schedule_df[schedule_df['client_id'] != 'DEPOT'])}")
-        print(f"Total Distance: {schedule_df['cumulative_distance_km'].max():.2f} km")
-        print(f"Total Travel Time: {schedule_df['travel_time_from_previous_min'].sum()} minutes")
-        print(f"Total Service Time: {schedule_df['service_duration'].sum()} minutes")
-        print(f"Day Duration: {schedule_df.iloc[0]['arrival_time']} - {schedule_df.iloc[-1]['arrival_time']}")
-        print("="*80 + "\n")
+                lines.append(f"\n{row.arrival_time} | 📍 Arrive at {row.location}")
+                lines.append(f"           Distance from previous: {row.distance_from_previous_km:.1f} km | "
+                             f"Travel: {row.travel_time_from_previous_min} min")
+                lines.append(f"{row.service_start} | 🤝 Meeting Start ({row.service_duration} min) - {row.activity}")
+                lines.append(f"{row.service_end} | ✓ Meeting End, Depart")
+        
+        lines += [
+            "\n" + "="*80,
+            "SUMMARY",
+            "="*80,
+            f"Total Clients Visited: {len(schedule_df[schedule_df['client_id'] != 'DEPOT'])}",
+            f"Total Distance: {schedule_df['cumulative_distance_km'].max():.2f} km",
+            f"Total Travel Time: {schedule_df['travel_time_from_previous_min'].sum()} minutes",
+            f"Total Service Time: {schedule_df['service_duration'].sum()} minutes",
+            f"Day Duration: {schedule_df.iloc[0]['arrival_time']} - {schedule_df.iloc[-1]['arrival_time']}",
+            "="*80 + "\n"
+        ]
+        
+        # One write for the whole report instead of a print per line
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def export_to_csv(self, schedule_df: pd.DataFrame, filepath: str):
         """Export schedule to CSV"""
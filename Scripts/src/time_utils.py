@@ -0,0 +1,4 @@
+def time_to_minutes(time_str: str) -> int:
+    """Convert HH:MM to minutes since midnight"""
+    hours, minutes = time_str.split(':')
+    return int(hours) * 60 + int(minutes)
@@ -1,9 +1,110 @@
 import folium
 from folium import plugins
+from branca.element import MacroElement
+from jinja2 import Template
 import pandas as pd
 import numpy as np
 from typing import Dict, List
-from datetime import datetime
+from time_utils import time_to_minutes
+
+# Map HTML snippets, compiled once at import
+POPUP_TEMPLATE = Template("""
+<div style="font-family: Arial; width: 280px;">
+    <h4 style="margin: 0; color: #333;">
+        #{{ number }} - {{ name }}
+    </h4>
+    <hr style="margin: 5px 0;">
+    <table style="width: 100%; font-size: 12px;">
+        <tr><td><b>Client ID:</b></td><td>{{ client_id }}</td></tr>
+        <tr><td><b>Priority:</b></td><td><span style="color: {{ color }};">⬤ {{ priority }}</span></td></tr>
+        <tr><td><b>Arrival:</b></td><td>{{ sched.arrival_time }}</td></tr>
+        <tr><td><b>Meeting:</b></td><td>{{ sched.service_start }} - {{ sched.service_end }}</td></tr>
+        <tr><td><b>Duration:</b></td><td>{{ sched.service_duration }} min</td></tr>
+        <tr><td><b>Time Window:</b></td><td>{{ tw_start }} - {{ tw_end }}</td></tr>
+        <tr><td><b>Distance:</b></td><td>{{ '%.1f'|format(sched.distance_from_previous_km) }} km from previous</td></tr>
+        <tr><td><b>Travel Time:</b></td><td>{{ sched.travel_time_from_previous_min }} min</td></tr>
+    </table>
+</div>
+""")
+
+LABEL_TEMPLATE = Template("""
+<div style="
+    font-size: 14px; 
+    font-weight: bold; 
+    color: white; 
+    background-color: {{ color }}; 
+    border-radius: 50%; 
+    width: 25px; 
+    height: 25px; 
+    display: flex; 
+    align-items: center; 
+    justify-content: center;
+    border: 2px solid white;
+    box-shadow: 0 0 5px rgba(0,0,0,0.5);
+">
+    {{ number }}
+</div>
+""")
+
+LEGEND_TEMPLATE = Template("""
+<div style="
+    position: fixed; 
+    bottom: 50px; 
+    left: 50px; 
+    width: 280px; 
+    background-color: white; 
+    border: 2px solid grey; 
+    z-index: 9999; 
+    font-size: 14px;
+    padding: 10px;
+    border-radius: 5px;
+">
+    <h4 style="margin: 0 0 10px 0;">📊 Route Summary</h4>
+    <hr style="margin: 5px 0;">
+    <b>Rep:</b> {{ config.sales_rep.name }}<br>
+    <b>Clients Visited:</b> {{ solution.num_locations }}<br>
+    <b>Total Distance:</b> {{ '%.2f'|format(solution.total_distance_km) }} km<br>
+    <b>Total Time:</b> {{ '%.2f'|format(solution.total_time_minutes / 60) }} hours<br>
+    <b>Max Distance:</b> {{ config.sales_rep.max_distance_km }} km<br>
+    <b>Max Travel:</b> {{ config.sales_rep.max_travel_hours }} hours<br>
+    <hr style="margin: 5px 0;">
+    <b>Legend:</b><br>
+    🏢 <span style="color: red;">Red</span> - Office/Depot<br>
+    ⬤ <span style="color: red;">Red</span> - High Priority<br>
+    ⬤ <span style="color: orange;">Orange</span> - Medium Priority<br>
+    ⬤ <span style="color: blue;">Blue</span> - Low Priority<br>
+</div>
+""")
+
+class RouteStopLayer(MacroElement):
+    """Client stop markers serialized as one JSON blob and built in the browser"""
+    
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.featureGroup().addTo({{ this._parent.get_name() }});
+            var {{ this.get_name() }}_stops = {{ this.stops|tojson }};
+            {{ this.get_name() }}_stops.forEach(function(stop) {
+                L.marker([stop.lat, stop.lon], {
+                    icon: L.AwesomeMarkers.icon({
+                        icon: 'briefcase', prefix: 'fa', iconColor: 'white',
+                        markerColor: stop.color, extraClasses: 'fa-rotate-0'
+                    })
+                })
+                    .bindPopup(stop.popup, {maxWidth: 300})
+                    .bindTooltip(stop.tooltip, {sticky: true})
+                    .addTo({{ this.get_name() }});
+                L.marker([stop.lat, stop.lon], {
+                    icon: L.divIcon({className: 'empty', html: stop.label})
+                }).addTo({{ this.get_name() }});
+            });
+        {% endmacro %}
+    """)
+    
+    def __init__(self, stops: List[Dict]):
+        super().__init__()
+        self._name = 'RouteStopLayer'
+        self.stops = stops
+
 
 class RouteVisualizer:
     """Create interactive map visualization of optimized route"""
@@ -44,133 +145,80 @@ class RouteVisualizer:
         
         # Add client markers with route sequence
         route = self.solution['route']
-        route_coords = []
+        stops = []
+        
+        # Client columns as plain lists indexed by location - 1, and the
+        # schedule keyed by client, so the loop body is only local lookups
+        lats = self.clients_df['latitude'].tolist()
+        lons = self.clients_df['longitude'].tolist()
+        ids = self.clients_df['client_id'].tolist()
+        names = self.clients_df['client_name'].tolist()
+        prios = self.clients_df['priority'].tolist()
+        tw_starts = self.clients_df['time_window_start'].tolist()
+        tw_ends = self.clients_df['time_window_end'].tolist()
+        schedule_by_id = dict(zip(self.schedule_df['client_id'],
+                                  self.schedule_df.to_dict('records')))
         
-        for i, stop in enumerate(route):
-            location_idx = stop['location_index']
+        # Color based on priority
+        color_of = {
+            'High': 'red',
+            'Medium': 'orange',
+            'Low': 'blue'
+        }.get
+        render_popup = POPUP_TEMPLATE.render
+        render_label = LABEL_TEMPLATE.render
+        add_stop = stops.append
+        
+        for stop in route:
+            location_idx = stop.location_index
             
             if location_idx == 0:  # Depot
-                route_coords.append([depot_lat, depot_lon])
-            else:
-                client = self.clients_df.iloc[location_idx - 1]
-                lat, lon = client['latitude'], client['longitude']
-                route_coords.append([lat, lon])
-                
-                # Get schedule info for this stop
-                schedule_info = self.schedule_df[
-                    self.schedule_df['client_id'] == client['client_id']
-                ].iloc[0]
-                
-                # Color based on priority
-                color_map = {
-                    'High': 'red',
-                    'Medium': 'orange',
-                    'Low': 'blue'
-                }
-                color = color_map.get(client['priority'], 'gray')
-                
-                # Create detailed popup
-                popup_html = f"""
-                <div style="font-family: Arial; width: 280px;">
-                    <h4 style="margin: 0; color: #333;">
-                        #{schedule_info['sequence']-1} - {client['client_name']}
-                    </h4>
-                    <hr style="margin: 5px 0;">
-                    <table style="width: 100%; font-size: 12px;">
-                        <tr><td><b>Client ID:</b></td><td>{client['client_id']}</td></tr>
-                        <tr><td><b>Priority:</b></td><td><span style="color: {color};">⬤ {client['priority']}</span></td></tr>
-                        <tr><td><b>Arrival:</b></td><td>{schedule_info['arrival_time']}</td></tr>
-                        <tr><td><b>Meeting:</b></td><td>{schedule_info['service_start']} - {schedule_info['service_end']}</td></tr>
-                        <tr><td><b>Duration:</b></td><td>{schedule_info['service_duration']} min</td></tr>
-                        <tr><td><b>Time Window:</b></td><td>{client['time_window_start']} - {client['time_window_end']}</td></tr>
-                        <tr><td><b>Distance:</b></td><td>{schedule_info['distance_from_previous_km']:.1f} km from previous</td></tr>
-                        <tr><td><b>Travel Time:</b></td><td>{schedule_info['travel_time_from_previous_min']} min</td></tr>
-                    </table>
-                </div>
-                """
-                
-                folium.Marker(
-                    location=[lat, lon],
-                    popup=folium.Popup(popup_html, max_width=300),
-                    icon=folium.Icon(
-                        color=color, 
-                        icon='briefcase', 
-                        prefix='fa'
-                    ),
-                    tooltip=f"#{schedule_info['sequence']-1}: {client['client_name']}"
-                ).add_to(m)
-                
-                # Add sequence number label
-                folium.Marker(
-                    location=[lat, lon],
-                    icon=folium.DivIcon(html=f"""
-                        <div style="
-                            font-size: 14px; 
-                            font-weight: bold; 
-                            color: white; 
-                            background-color: {color}; 
-                            border-radius: 50%; 
-                            width: 25px; 
-                            height: 25px; 
-                            display: flex; 
-                            align-items: center; 
-                            justify-content: center;
-                            border: 2px solid white;
-                            box-shadow: 0 0 5px rgba(0,0,0,0.5);
-                        ">
-                            {schedule_info['sequence']-1}
-                        </div>
-                    """)
-                ).add_to(m)
-        
-        # Draw route line
-        folium.PolyLine(
-            route_coords,
-            color='blue',
-            weight=3,
-            opacity=0.7,
-            popup=f"Total Distance: {self.solution['total_distance_km']:.2f} km"
-        ).add_to(m)
+                continue
+            
+            row = location_idx - 1
+            client_id, name, priority = ids[row], names[row], prios[row]
+            
+            # Get schedule info for this stop
+            schedule_info = schedule_by_id[client_id]
+            number = schedule_info['sequence'] - 1
+            color = color_of(priority, 'gray')
+            
+            add_stop({
+                'lat': lats[row],
+                'lon': lons[row],
+                'color': color,
+                'popup': render_popup(number=number, name=name, client_id=client_id,
+                                      priority=priority, color=color,
+                                      tw_start=tw_starts[row], tw_end=tw_ends[row],
+                                      sched=schedule_info),
+                'tooltip': f"#{number}: {name}",
+                'label': render_label(number=number, color=color)
+            })
+        
+        # Add all client markers in one batch
+        RouteStopLayer(stops).add_to(m)
         
-        # Add arrows to show direction
+        # Route coordinates in visit order, gathered in one pass (depot is location 0)
+        location_coords = np.vstack([
+            [depot_lat, depot_lon],
+            self.clients_df[['latitude', 'longitude']].to_numpy()
+        ])
+        route_indices = np.fromiter((stop.location_index for stop in route),
+                                    dtype=np.int64, count=len(route))
+        route_coords = location_coords[route_indices]
+        
+        # Draw route line, animated to show direction
         plugins.AntPath(
-            route_coords,
+            route_coords.tolist(),
             color='blue',
             weight=3,
-            opacity=0.6,
-            delay=1000
+            opacity=0.7,
+            delay=1000,
+            popup=f"Total Distance: {self.solution['total_distance_km']:.2f} km"
         ).add_to(m)
         
         # Add legend
-        legend_html = f"""
-        <div style="
-            position: fixed; 
-            bottom: 50px; 
-            left: 50px; 
-            width: 280px; 
-            background-color: white; 
-            border: 2px solid grey; 
-            z-index: 9999; 
-            font-size: 14px;
-            padding: 10px;
-            border-radius: 5px;
-        ">
-            <h4 style="margin: 0 0 10px 0;">📊 Route Summary</h4>
-            <hr style="margin: 5px 0;">
-            <b>Rep:</b> {self.config['sales_rep']['name']}<br>
-            <b>Clients Visited:</b> {self.solution['num_locations']}<br>
-            <b>Total Distance:</b> {self.solution['total_distance_km']:.2f} km<br>
-            <b>Total Time:</b> {self.solution['total_time_minutes']/60:.2f} hours<br>
-            <b>Max Distance:</b> {self.config['sales_rep']['max_distance_km']} km<br>
-            <b>Max Travel:</b> {self.config['sales_rep']['max_travel_hours']} hours<br>
-            <hr style="margin: 5px 0;">
-            <b>Legend:</b><br>
-            🏢 <span style="color: red;">Red</span> - Office/Depot<br>
-            ⬤ <span style="color: red;">Red</span> - High Priority<br>
-            ⬤ <span style="color: orange;">Orange</span> - Medium Priority<br>
-            ⬤ <span style="color: blue;">Blue</span> - Low Priority<br>
-        </div>
-        """
+        legend_html = LEGEND_TEMPLATE.render(config=self.config, solution=self.solution)
         m.get_root().html.add_child(folium.Element(legend_html))
         
         # Save map
@@ -181,28 +229,30 @@ class RouteVisualizer:
     
     def create_gantt_chart(self):
         """Create simple text-based Gantt chart"""
-        print("\n" + "="*80)
-        print("GANTT CHART - TIME ALLOCATION")
-        print("="*80)
-        
-        working_start = datetime.strptime(
-            self.config['sales_rep']['working_hours']['start'], '%H:%M'
+        working_start = time_to_minutes(
+            self.config['sales_rep']['working_hours']['start']
         )
         
-        for _, row in self.schedule_df.iterrows():
-            if row['client_id'] != 'DEPOT' or row['sequence'] == 1:
-                arrival = datetime.strptime(row['arrival_time'], '%H:%M')
-                
-                # Calculate minutes from start
-                minutes_from_start = int((arrival - working_start).total_seconds() / 60)
-                bar_length = minutes_from_start // 10  # Scale: 1 char = 10 min
-                
-                bar = '─' * bar_length + '●'
-                
-                if row['client_id'] == 'DEPOT':
-                    print(f"{row['arrival_time']} {bar} 🏢 START")
-                else:
-                    duration_bar = '█' * (row['service_duration'] // 10)
-                    print(f"{row['arrival_time']} {bar}{duration_bar} {row['location'][:30]}")
-        
-        print("="*80 + "\n")
\ No newline at end of file
+        # Client stops plus the start of day
+        rows = self.schedule_df[(self.schedule_df['client_id'] != 'DEPOT') |
+                                (self.schedule_df['sequence'] == 1)]
+        
+        # Calculate minutes from start, scale: 1 char = 10 min
+        minutes_from_start = rows['arrival_time'].map(time_to_minutes) - working_start
+        bar_lengths = (minutes_from_start // 10).clip(lower=0).tolist()
+        duration_lengths = (rows['service_duration'] // 10).tolist()
+        
+        lines = ["\n" + "="*80, "GANTT CHART - TIME ALLOCATION", "="*80]
+        
+        for arrival, client_id, location, bar_length, duration_length in zip(
+                rows['arrival_time'], rows['client_id'], rows['location'],
+                bar_lengths, duration_lengths):
+            bar = '─' * bar_length + '●'
+            
+            if client_id == 'DEPOT':
+                lines.append(f"{arrival} {bar} 🏢 START")
+            else:
+                lines.append(f"{arrival} {bar}{'█' * duration_length} {location[:30]}")
+        
+        lines.append("="*80 + "\n")
+        print("\n".join(lines))
\ No newline at end of file
@@ -1,48 +1,181 @@
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
 import numpy as np
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
 from typing import Dict, List, Tuple
 
+logger = logging.getLogger(__name__)
+
+# OR-Tools distance units per km (centimeters, for sub-meter arc precision)
+DISTANCE_UNITS_PER_KM = 100000
+
+# Upper bound on waiting time at a stop (minutes)
+MAX_WAITING_MINUTES = 60
+
+# First-solution strategies raced against each other by solve_parallel
+PARALLEL_FIRST_SOLUTION_STRATEGIES = (
+    'PATH_CHEAPEST_ARC',
+    'SAVINGS',
+    'CHRISTOFIDES',
+    'PARALLEL_CHEAPEST_INSERTION',
+    'LOCAL_CHEAPEST_INSERTION',
+    'GLOBAL_CHEAPEST_ARC',
+)
+
+
+@dataclass(slots=True)
+class RouteStop:
+    """One visit on the optimized route"""
+    location_index: int
+    arrival_time: int  # minutes, on the same clock as the time windows
+    cumulative_distance: int  # meters from the start of the route
+
+
+def _scaled_int32(matrix: np.ndarray, scale: float, block_rows: int = 256) -> np.ndarray:
+    """Round matrix * scale into a preallocated int32 array, a row block at a time"""
+    matrix = np.asarray(matrix)
+    out = np.empty(matrix.shape, dtype=np.int32)
+    buffer = np.empty((min(block_rows, len(matrix)),) + matrix.shape[1:], dtype=np.float64)
+    
+    for start in range(0, len(matrix), block_rows):
+        rows = slice(start, start + block_rows)
+        block = buffer[:len(out[rows])]
+        np.multiply(matrix[rows], scale, out=block)
+        np.rint(block, out=out[rows], casting='unsafe')
+    
+    return out
+
+
+def _earliest_arrivals(transit: np.ndarray, source: int) -> np.ndarray:
+    """Shortest-path arrival time at every node from source (dense Dijkstra)"""
+    n = len(transit)
+    arrival = np.full(n, np.inf)
+    arrival[source] = 0.0
+    settled = np.zeros(n, dtype=bool)
+    
+    for _ in range(n):
+        node = int(np.argmin(np.where(settled, np.inf, arrival)))
+        settled[node] = True
+        np.minimum(arrival, arrival[node] + transit[node], out=arrival)
+    
+    return arrival
+
+
+def _solve_with_strategy(data: Dict, time_limit: int, strategy: str) -> Tuple[str, Dict]:
+    """Worker process entry point for VRPSolver.solve_parallel"""
+    solver = VRPSolver(data)
+    return strategy, solver.solve(time_limit, first_solution_strategy=strategy)
+
+
 class VRPSolver:
     """Vehicle Routing Problem solver using Google OR-Tools"""
     
     def __init__(self, data: Dict):
+        self.last_route = None
         self.data = data
+        
+    @property
+    def data(self) -> Dict:
+        return self._data
+    
+    @data.setter
+    def data(self, data: Dict):
+        """Assigning new data drops the routing model built from the old data"""
+        self._data = data
         self.manager = None
         self.routing = None
         self.solution = None
-        
+        self._built = False
+    
     def create_data_model(self, distance_matrix: np.ndarray, 
                          time_matrix: np.ndarray,
                          time_windows: List[Tuple[int, int]],
                          service_times: List[int],
                          max_distance: float,
                          max_time: int) -> Dict:
-        """Create data model for VRP"""
+        """Create data model for VRP (distance_matrix in km, time_matrix in minutes)"""
         
         data = {}
-        data['distance_matrix'] = distance_matrix.astype(int).tolist()
-        data['time_matrix'] = time_matrix.astype(int).tolist()
+        # OR-Tools works in integer centimeters; rounded rather than truncated.
+        # Scaled straight into int32 arrays without a full-size float temporary;
+        # nested lists are only built when registering.
+        data['distance_matrix'] = _scaled_int32(distance_matrix, DISTANCE_UNITS_PER_KM)
+        data['time_matrix'] = _scaled_int32(time_matrix, 1)
+        # Travel time plus service time at the origin node, per arc
+        data['total_time_matrix'] = (
+            data['time_matrix'] + np.asarray(service_times, dtype=np.int32)[:, None]
+        )
         data['time_windows'] = time_windows
+        data['tw_start'] = np.asarray([tw[0] for tw in time_windows], dtype=np.int64)
+        data['tw_end'] = np.asarray([tw[1] for tw in time_windows], dtype=np.int64)
         data['service_times'] = service_times
         data['num_vehicles'] = 1
         data['depot'] = 0
-        data['vehicle_capacity'] = int(max_distance * 1000)  # Convert to meters
+        data['vehicle_capacity'] = int(max_distance * DISTANCE_UNITS_PER_KM)  # Convert to cm
         data['vehicle_time_capacity'] = max_time
         
+        # Any single-vehicle tour leaves each node at most once, so the sum of
+        # the row maxima bounds its length. Below the cap the Distance
+        # dimension can never bind and is skipped.
+        max_required_distance = int(data['distance_matrix'].max(axis=1).sum())
+        data['use_distance_dimension'] = data['vehicle_capacity'] < max_required_distance
+        
+        # Waiting is only ever needed to reach a window opening, so the slack
+        # domain is bounded by the largest gap between a window start and the
+        # earliest possible arrival there (leaving the depot at its opening).
+        earliest = data['tw_start'][data['depot']] + _earliest_arrivals(
+            data['total_time_matrix'], data['depot'])
+        max_wait = int(np.max(data['tw_start'] - earliest, initial=0))
+        data['max_slack'] = min(MAX_WAITING_MINUTES, max_wait)
+        
+        # Every node is left exactly once, so the cheapest outgoing arc of
+        # each (travel + service) gives a lower bound on the route duration
+        outgoing = data['total_time_matrix'].astype(np.int64)
+        np.fill_diagonal(outgoing, np.iinfo(np.int64).max)
+        data['min_route_time'] = int(outgoing.min(axis=1).sum()) if len(outgoing) > 1 else 0
+        
         return data
     
-    def solve(self, time_limit: int = 30) -> Dict:
+    def solve(self, time_limit: int = 30,
+              first_solution_strategy: str = 'PATH_CHEAPEST_ARC',
+              initial_route: List[int] = None,
+              verbose: bool = False) -> Dict:
         """
-        Solve the VRP problem
+        Solve the VRP problem, building the routing model on first use
         
         Args:
             time_limit: Maximum time in seconds for optimization
+            first_solution_strategy: Name of an OR-Tools FirstSolutionStrategy
+            initial_route: Client node order to warm-start from (e.g. a
+                previous solver's last_route); skips the first-solution phase
+            verbose: Stream OR-Tools' per-neighborhood search log to stdout
             
         Returns:
             Solution dictionary with route and statistics
         """
+        # Skip the search when even the lower bound overruns the working day
+        depot_idx = self.data['depot']
+        available_time = (min(self.data['vehicle_time_capacity'], self.data['tw_end'][depot_idx])
+                          - self.data['tw_start'][depot_idx])
+        if self.data['min_route_time'] > available_time:
+            logger.warning(f"\n✗ Infeasible: route needs at least {self.data['min_route_time']} "
+                           f"minutes but only {available_time} are available")
+            return None
+        
+        return self.run_search(time_limit, first_solution_strategy, initial_route, verbose)
+    
+    def build_model(self):
+        """Create the index manager, routing model, dimensions and time windows (once)"""
+        if self._built:
+            return
+        
         data = self.data
+        # Any previous solution belongs to the model being replaced
+        self.solution = None
         
         # Create routing index manager
         self.manager = pywrapcp.RoutingIndexManager(
@@ -51,41 +184,38 @@ class VRPSolver:
             data['depot']
         )
         
-        # Create routing model
-        self.routing = pywrapcp.RoutingModel(self.manager)
+        # Create routing model. The transits are native matrix lookups, so the
+        # callback cache stays at its default (off); it would only copy them.
+        model_parameters = pywrapcp.DefaultRoutingModelParameters()
+        model_parameters.reduce_vehicle_cost_model = True
+        self.routing = pywrapcp.RoutingModel(self.manager, model_parameters)
         
-        # Create distance callback
-        def distance_callback(from_index, to_index):
-            from_node = self.manager.IndexToNode(from_index)
-            to_node = self.manager.IndexToNode(to_index)
-            return data['distance_matrix'][from_node][to_node]
+        # Register the distance matrix so arc costs are read natively by OR-Tools;
+        # the model has a single vehicle, so its cost is set directly
+        distance_callback_index = self.routing.RegisterTransitMatrix(
+            data['distance_matrix'].tolist())
+        self.routing.SetArcCostEvaluatorOfVehicle(distance_callback_index, 0)
         
-        distance_callback_index = self.routing.RegisterTransitCallback(distance_callback)
-        self.routing.SetArcCostEvaluatorOfAllVehicles(distance_callback_index)
+        # Add distance dimension, only when the distance limit can bind
+        if data['use_distance_dimension']:
+            self.routing.AddDimension(
+                distance_callback_index,
+                0,  # no slack
+                data['vehicle_capacity'],  # vehicle maximum travel distance
+                True,  # start cumul to zero
+                'Distance'
+            )
         
-        # Add distance dimension
-        self.routing.AddDimension(
-            distance_callback_index,
-            0,  # no slack
-            data['vehicle_capacity'],  # vehicle maximum travel distance
-            True,  # start cumul to zero
-            'Distance'
-        )
-        
-        # Create time callback
-        def time_callback(from_index, to_index):
-            from_node = self.manager.IndexToNode(from_index)
-            to_node = self.manager.IndexToNode(to_index)
-            travel_time = data['time_matrix'][from_node][to_node]
-            service_time = data['service_times'][from_node]
-            return int(travel_time + service_time)
-        
-        time_callback_index = self.routing.RegisterTransitCallback(time_callback)
+        # Register travel + service time matrix. Service is folded into the
+        # precomputed matrix: a unary vector dimension would be a separate
+        # dimension, and the binding has no per-node transit on 'Time'
+        time_callback_index = self.routing.RegisterTransitMatrix(
+            data['total_time_matrix'].tolist())
         
         # Add time dimension with time windows
         self.routing.AddDimension(
             time_callback_index,
-            60,  # allow waiting time (60 minutes max)
+            data['max_slack'],  # allow waiting time, bounded by max_slack
             data['vehicle_time_capacity'],  # maximum time per vehicle
             False,  # don't force start cumul to zero
             'Time'
@@ -94,17 +224,19 @@ class VRPSolver:
         time_dimension = self.routing.GetDimensionOrDie('Time')
         
         # Add time window constraints
-        for location_idx, time_window in enumerate(data['time_windows']):
-            if location_idx == data['depot']:
+        node_to_index = self.manager.NodeToIndex
+        cumul = time_dimension.CumulVar
+        tw_start = data['tw_start'].tolist()
+        tw_end = data['tw_end'].tolist()
+        depot_idx = data['depot']
+        
+        for location_idx in range(len(tw_start)):
+            if location_idx == depot_idx:
                 continue
-            index = self.manager.NodeToIndex(location_idx)
-            time_dimension.CumulVar(index).SetRange(time_window[0], time_window[1])
+            cumul(node_to_index(location_idx)).SetRange(tw_start[location_idx], tw_end[location_idx])
         
         # Add time windows for depot (start and end of day)
-        depot_idx = data['depot']
-        index = self.manager.NodeToIndex(depot_idx)
-        time_dimension.CumulVar(index).SetRange(data['time_windows'][depot_idx][0], 
-                                                data['time_windows'][depot_idx][1])
+        cumul(node_to_index(depot_idx)).SetRange(tw_start[depot_idx], tw_end[depot_idx])
         
         # Instantiate route start and end times to produce feasible times
         for i in range(data['num_vehicles']):
@@ -113,76 +245,171 @@ class VRPSolver:
             self.routing.AddVariableMinimizedByFinalizer(
                 time_dimension.CumulVar(self.routing.End(i)))
         
+        self._built = True
+    
+    def run_search(self, time_limit: int = 30,
+                   first_solution_strategy: str = 'PATH_CHEAPEST_ARC',
+                   initial_route: List[int] = None,
+                   verbose: bool = False) -> Dict:
+        """Run GLS on the built model, rebuilding it if already searched; see solve for the arguments"""
+        data = self.data
+        
+        # OR-Tools only reads routes into a model that has not been searched,
+        # and searching the same model twice crashes intermittently, so every
+        # search runs on a model that has not been searched yet
+        if self._built and self.routing.status() != pywrapcp.RoutingModel.ROUTING_NOT_SOLVED:
+            self._built = False
+        if not self._built:
+            self.build_model()
+        
         # Set search parameters
         search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-        search_parameters.first_solution_strategy = (
-            routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+        search_parameters.first_solution_strategy = getattr(
+            routing_enums_pb2.FirstSolutionStrategy, first_solution_strategy
         )
         search_parameters.local_search_metaheuristic = (
             routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
         )
+        # Cross-exchange and chain relocation help GLS on time-windowed tours
+        operators = search_parameters.local_search_operators
+        operators.use_cross_exchange = pywrapcp.BOOL_TRUE
+        operators.use_relocate_neighbors = pywrapcp.BOOL_TRUE
+        operators.use_relocate_subtrip = pywrapcp.BOOL_TRUE
+        search_parameters.guided_local_search_lambda_coefficient = 0.1
         search_parameters.time_limit.seconds = time_limit
-        search_parameters.log_search = True
+        search_parameters.log_search = verbose
         
         # Solve the problem
-        print("\n" + "="*60)
-        print("Starting VRP Optimization...")
-        print("="*60)
+        logger.info("\n" + "="*60)
+        logger.info("Starting VRP Optimization...")
+        logger.info("="*60)
         
-        self.solution = self.routing.SolveWithParameters(search_parameters)
+        initial_assignment = None
+        if initial_route is not None:
+            depot_idx = data['depot']
+            node_to_index = self.manager.NodeToIndex
+            routes = [[node_to_index(node) for node in initial_route if node != depot_idx]]
+            initial_assignment = self.routing.ReadAssignmentFromRoutes(routes, True)
+            if initial_assignment is None:
+                # A model that rejected the routes finds no solution afterwards
+                logger.warning("✗ Initial route is infeasible, solving from scratch")
+                self._built = False
+                self.build_model()
+        
+        if initial_assignment is not None:
+            self.solution = self.routing.SolveFromAssignmentWithParameters(
+                initial_assignment, search_parameters)
+        else:
+            self.solution = self.routing.SolveWithParameters(search_parameters)
         
         if self.solution:
             return self._extract_solution()
         else:
-            print("\n✗ No solution found!")
+            logger.warning("\n✗ No solution found!")
             return None
     
+    def solve_parallel(self, time_limit: int = 30, n_workers: int = None) -> Dict:
+        """
+        Solve with several first-solution strategies in parallel processes
+        
+        Each worker runs a full GLS search from a different starting
+        strategy; the solution with the shortest total distance wins.
+        
+        Args:
+            time_limit: Maximum time in seconds for each worker
+            n_workers: Number of strategies/processes (default: up to 4)
+            
+        Returns:
+            Best solution dictionary, or None if no worker found one
+        """
+        if n_workers is None:
+            n_workers = min(4, os.cpu_count() or 1)
+        strategies = PARALLEL_FIRST_SOLUTION_STRATEGIES[:n_workers]
+        
+        best = None
+        # spawn, not fork: OR-Tools and numba's thread pools don't survive a fork
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(strategies), mp_context=context) as pool:
+            futures = [pool.submit(_solve_with_strategy, self.data, time_limit, strategy)
+                       for strategy in strategies]
+            
+            for future in as_completed(futures):
+                strategy, solution = future.result()
+                if solution is None:
+                    continue
+                logger.info(f"✓ {strategy}: {solution['total_distance_km']:.2f} km")
+                if best is None or solution['total_distance_km'] < best['total_distance_km']:
+                    best = solution
+        
+        return best
+    
     def _extract_solution(self) -> Dict:
         """Extract solution details"""
         data = self.data
         time_dimension = self.routing.GetDimensionOrDie('Time')
-        distance_dimension = self.routing.GetDimensionOrDie('Distance')
+        distance_matrix = data['distance_matrix']
+        
+        # Bind hot lookups to locals for the route walk
+        index_to_node = self.manager.IndexToNode
+        time_var = time_dimension.CumulVar
+        sol_min = self.solution.Min
+        sol_value = self.solution.Value
+        next_var = self.routing.NextVar
+        is_end = self.routing.IsEnd
         
-        route = []
+        # A single vehicle visits every node once, plus the depot return
+        route = [None] * (len(distance_matrix) + 1)
+        stop_count = 0
         total_distance = 0
         total_time = 0
         
+        # Cumulative distance is summed along the route; with no slack this
+        # equals the Distance dimension cumul, which may not exist.
+        # Route stops report it in whole meters.
+        units_per_meter = DISTANCE_UNITS_PER_KM // 1000
+        cumulative_distance = 0
+        prev_node = None
         index = self.routing.Start(0)
         
-        while not self.routing.IsEnd(index):
-            node_index = self.manager.IndexToNode(index)
-            time_var = time_dimension.CumulVar(index)
-            distance_var = distance_dimension.CumulVar(index)
+        while not is_end(index):
+            node_index = index_to_node(index)
+            if prev_node is not None:
+                cumulative_distance += int(distance_matrix[prev_node, node_index])
             
-            route.append({
-                'location_index': node_index,
-                'arrival_time': self.solution.Min(time_var),
-                'cumulative_distance': self.solution.Min(distance_var)
-            })
+            route[stop_count] = RouteStop(
+                node_index,
+                sol_min(time_var(index)),
+                round(cumulative_distance / units_per_meter)
+            )
+            stop_count += 1
             
-            index = self.solution.Value(self.routing.NextVar(index))
+            prev_node = node_index
+            index = sol_value(next_var(index))
         
         # Add final depot return
-        node_index = self.manager.IndexToNode(index)
-        time_var = time_dimension.CumulVar(index)
-        distance_var = distance_dimension.CumulVar(index)
-        
-        route.append({
-            'location_index': node_index,
-            'arrival_time': self.solution.Min(time_var),
-            'cumulative_distance': self.solution.Min(distance_var)
-        })
-        
-        total_distance = self.solution.Min(distance_var) / 1000  # Convert to km
-        total_time = self.solution.Min(time_var)
-        
-        print("\n" + "="*60)
-        print("✓ OPTIMIZATION COMPLETED SUCCESSFULLY")
-        print("="*60)
-        print(f"Total Distance: {total_distance:.2f} km")
-        print(f"Total Time: {total_time} minutes ({total_time/60:.2f} hours)")
-        print(f"Locations Visited: {len(route) - 1}")  # Exclude depot return
-        print("="*60 + "\n")
+        node_index = index_to_node(index)
+        cumulative_distance += int(distance_matrix[prev_node, node_index])
+        total_time = sol_min(time_var(index))
+        
+        route[stop_count] = RouteStop(
+            node_index,
+            total_time,
+            round(cumulative_distance / units_per_meter)
+        )
+        del route[stop_count + 1:]
+        
+        total_distance = cumulative_distance / DISTANCE_UNITS_PER_KM  # Convert to km
+        
+        # Visiting order of the clients, reusable as a warm start
+        self.last_route = [stop.location_index for stop in route[1:-1]]
+        
+        logger.info("\n" + "="*60)
+        logger.info("✓ OPTIMIZATION COMPLETED SUCCESSFULLY")
+        logger.info("="*60)
+        logger.info(f"Total Distance: {total_distance:.2f} km")
+        logger.info(f"Total Time: {total_time} minutes ({total_time/60:.2f} hours)")
+        logger.info(f"Locations Visited: {len(route) - 1}")  # Exclude depot return
+        logger.info("="*60 + "\n")
         
         return {
             'route': route,